@@ -30,24 +30,26 @@ def _register_command(name):
 
 @_register_command("!help")
 def _command_help(_context, args):
-    if args and args[0] in HELPS:
-        print(HELPS[args[0]])
+    topic = args.split(None, 1)[0] if args else None
+    if topic in HELPS:
+        print(HELPS[topic])
     else:
         print(HELP_GLOBAL)
 
 
 @_register_command("!load")
 def _command_load(context, args):
-    if len(args) != 1 or args[0] not in VARS:
+    if args not in VARS:
         print(HELP_LOAD)
     else:
-        context.variables.update(VARS[args[0]])
+        context.variables.update(VARS[args])
 
 
 @_register_command("!vars")
 def _command_vars(context, _args):
-    for var in sorted(context.variables):
-        print(var + " = " + context.variables[var].evaluate(context, []).stringify(context, None))
+    # values may depend on other variables, outputs and features, so they are evaluated every time
+    for var, value in sorted(context.variables.items()):
+        print(f"{var} = {value.evaluate(context, set()).stringify(context, None)}")
 
 
 @_register_command("!reset")
@@ -67,12 +69,12 @@ def _command_clear(context, _args):
 def _command_toggle(context, args):
     if args:
         try:
-            feature = Feature(args[0])
+            feature = Feature(args.split(None, 1)[0])
         except ValueError:
             print(HELP_TOGGLE)
         else:
             context.features[feature] = not context.features[feature]
-            print("Toggled " + feature.value + " " + ["off", "on"][context.features[feature]] + ".")
+            print(f"Toggled {feature.value} {'on' if context.features[feature] else 'off'}.")
     else:
         print(HELP_TOGGLE)
 
@@ -80,7 +82,7 @@ def _command_toggle(context, args):
 @_register_command("!source")
 def _command_source(context, args):
     if args:
-        _run_file(context, " ".join(args))
+        _run_file(context, args)
     else:
         print(HELP_SOURCE)
 
@@ -92,11 +94,11 @@ def _command_as(context, args):
             print("You must perform a calculation before using !as.")
             return
         try:
-            unit = Unit.parse(replace_escapes(" ".join(args)))
+            unit = Unit.parse(replace_escapes(args))
         except MathParseError as ex:
             print(f"Error: {ex.args[0]}")
         else:
-            print(" " * len(str(len(context.outputs))) + "   " + context.outputs[-1].stringify(context, unit))
+            print(f"{' ' * len(str(len(context.outputs)))}   {context.outputs[-1].stringify(context, unit)}")
     else:
         print(HELP_AS)
 
@@ -106,72 +108,82 @@ def _command_exit(_context, _args):
     sys.exit(0)
 
 
-def _run_command(context, command, *args):
+def _run_command(context, command, args=""):
     if command in COMMANDS:
         COMMANDS[command](context, args)
     else:
-        print("Unknown command " + command + ". Type !help for help.")
+        print(f"Unknown command {command}. Type !help for help.")
 
 
 def _run_line(context, line):
-    if not line or line.startswith("#"):
+    if not line or line[0] == "#":
         return
     if line[0] == "!":
-        _run_command(context, *line.split(None))
+        _run_command(context, *line.split(None, 1))
         return
     assigns, code, cast = parser.parse_input(line, context)
     if context.features[Feature.DEBUG]:
-        print("(" + str(len(context.outputs) + 1) + ") " + code.stringify(context, None))
-    result = code.evaluate(context, [])
+        print(f"({len(context.outputs) + 1}) {code.stringify(context, None)}")
+    result = code.evaluate(context, set())
     context.outputs.append(result)
     for variable in assigns:
         context.variables[variable.name] = result
-    print("[" + str(len(context.outputs)) + "] " + result.stringify(context, cast), end="")
     if isinstance(result, Value) and result.unit.quantity_name is not None:
-        print(" (" + result.unit.quantity_name + ")")
+        quantity = f" ({result.unit.quantity_name})"
     else:
-        print()
+        quantity = ""
+    print(f"[{len(context.outputs)}] {result.stringify(context, cast)}{quantity}")
 
 
 def _run_file(context, file):
     try:
-        with open(file, "r") as stream:
-            lines = stream.readlines()
+        stream = open(file, "r")
     except FileNotFoundError:
         print("File does not exist.")
         return False
     except IOError:
         print("Failed to read file.")
         return False
-    for lineno, line in enumerate(lines):
-        line = line.strip()
-        try:
-            _run_line(context, line)
-        except MathParseError as ex:
-            print("Syntax error on line %d: %s" % (lineno + 1, ex.args[0]))
-            break
-        except MathEvalError as ex:
-            print("Error on line %d: %s" % (lineno + 1, ex.args[0]))
-            break
+    with stream:
+        lines = enumerate(stream, 1)
+        while True:
+            # only errors from reading the file are caught here, errors from running a line are reported below
+            try:
+                lineno, line = next(lines)
+            except StopIteration:
+                break
+            except (IOError, UnicodeDecodeError):
+                print("Failed to read file.")
+                return False
+            line = line.strip()
+            try:
+                _run_line(context, line)
+            except MathParseError as ex:
+                print(f"Syntax error on line {lineno}: {ex.args[0]}")
+                break
+            except MathEvalError as ex:
+                print(f"Error on line {lineno}: {ex.args[0]}")
+                break
     return True
 
 
 def _setup_readline():
-    # setup readline if on posix
-    if os.name == "posix":
-        try:
-            import readline
-            # load history file if any exists
-            history_file = os.path.join(os.path.expanduser("~"), ".physcalc_history")
-            try:
-                readline.read_history_file(history_file)
-            except FileNotFoundError:
-                pass
-            readline.set_history_length(1000)
-            # save history file on exit
-            atexit.register(readline.write_history_file, history_file)
-        except ImportError:
-            pass
+    # setup readline if on posix and reading from a terminal
+    if os.name != "posix" or not sys.stdin.isatty():
+        return
+    try:
+        import readline
+    except ImportError:
+        return
+    # load history file if any exists
+    history_file = os.path.join(os.path.expanduser("~"), ".physcalc_history")
+    try:
+        readline.read_history_file(history_file)
+    except FileNotFoundError:
+        pass
+    readline.set_history_length(1000)
+    # save history file on exit
+    atexit.register(readline.write_history_file, history_file)
 
 
 def _main():
@@ -185,14 +197,16 @@ def _main():
         return 0
 
     print(LAUNCH_HELP)
-    _setup_readline()
     context = Context()
     if args.file:
         if not _run_file(context, args.file):
             return 1
 
+    # only needed for the interactive loop, so scripts that !exit never load it
+    _setup_readline()
+
     while True:
-        prompt = " " * len(str(len(context.outputs))) + " > "
+        prompt = f"{' ' * len(str(len(context.outputs)))} > "
         try:
             line = input(prompt).strip()
         except KeyboardInterrupt:
@@ -205,9 +219,9 @@ def _main():
         try:
             _run_line(context, line)
         except MathParseError as ex:
-            print("Syntax error: " + ex.args[0])
+            print(f"Syntax error: {ex.args[0]}")
         except MathEvalError as ex:
-            print("Error: " + ex.args[0])
+            print(f"Error: {ex.args[0]}")
 
     return 0
 
@@ -1,13 +1,13 @@
 import math
 
 from physcalc.value import Value
-from physcalc.unit import Unit
+from physcalc.unit import Unit, NO_UNIT
 
 CONSTANTS_MATH = {
-    "e": Value(math.e, Unit.parse("")),
-    "pi": Value(math.pi, Unit.parse("")),
-    "π": Value(math.pi, Unit.parse("")),
-    "j": Value(1j, Unit.parse("")),
+    "e": Value(math.e, NO_UNIT),
+    "pi": Value(math.pi, NO_UNIT),
+    "π": Value(math.pi, NO_UNIT),
+    "j": Value(1j, NO_UNIT),
 }
 
 CONSTANTS_PHYSICS = {
@@ -1,3 +1,5 @@
+from types import MappingProxyType
+
 from physcalc.constants import VARS
 from physcalc.context import Feature
 
@@ -65,14 +67,14 @@ HELP_COMMANDS = """Commands:
 !source <file> - execute file
 !exit          - quit REPL"""
 
-HELPS = {
+HELPS = MappingProxyType({
     "syntax": HELP_SYNTAX,
     "greek": HELP_GREEK,
     "vars": HELP_VARS,
     "commands": HELP_COMMANDS,
     "load": HELP_LOAD,
     "toggle": HELP_TOGGLE,
-}
+})
 
 HELP_GLOBAL = """Type expressions to compute them.
 Type !help <topic> to get help on a specific topic.
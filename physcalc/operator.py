@@ -1,5 +1,6 @@
 from enum import IntEnum
 from numbers import Real
+from operator import add, sub, mul, truediv, pow as _pow
 from typing import Callable, Optional, Tuple, TYPE_CHECKING
 
 from physcalc.syntax import Token
@@ -18,6 +19,8 @@ class OpPrecedence(IntEnum):
 class Operator(Token):
     registry = {}
 
+    __slots__ = ("name", "prec", "action", "is_unary", "inverse", "positive", "identity")
+
     name: str
     prec: OpPrecedence
     action: "Callable[[Value, Value], Value]"
@@ -51,16 +54,12 @@ class Operator(Token):
             Operator.registry[name] = oper
         return oper
 
-    @staticmethod
-    def parse(name, _):
-        return Operator.registry[name]
-
 
-OPERATOR_ADD = Operator.register(["+"], OpPrecedence.ADD, lambda a, b: a + b)
-OPERATOR_SUBTRACT = Operator.register(["-"], OpPrecedence.ADD, lambda a, b: a - b, True)
-OPERATOR_MULTIPLY = Operator.register(["*", "·", "×"], OpPrecedence.MULTIPLY, lambda a, b: a * b)
-OPERATOR_DIVIDE = Operator.register(["/", "÷"], OpPrecedence.MULTIPLY, lambda a, b: a / b)
-OPERATOR_POWER = Operator.register(["^", "**"], OpPrecedence.POWER, lambda a, b: a ** b)
+OPERATOR_ADD = Operator.register(["+"], OpPrecedence.ADD, add)
+OPERATOR_SUBTRACT = Operator.register(["-"], OpPrecedence.ADD, sub, True)
+OPERATOR_MULTIPLY = Operator.register(["*", "·", "×"], OpPrecedence.MULTIPLY, mul)
+OPERATOR_DIVIDE = Operator.register(["/", "÷"], OpPrecedence.MULTIPLY, truediv)
+OPERATOR_POWER = Operator.register(["^", "**"], OpPrecedence.POWER, _pow)
 
 OPERATOR_ADD.inverse = OPERATOR_SUBTRACT
 OPERATOR_SUBTRACT.inverse = OPERATOR_ADD
@@ -1,4 +1,5 @@
 import re
+from types import MappingProxyType
 
 from physcalc.context import Feature
 from physcalc.operator import Operator
@@ -10,8 +11,10 @@ from physcalc.value import Output, Variable, Value, OperatorExpression, PowerExp
 
 
 class SpecialToken(Token):
+    __slots__ = ("name",)
+
     name: str
-    
+
     def __init__(self, name):
         self.name = name
 
@@ -27,6 +30,8 @@ SpecialToken.COMMA = SpecialToken("comma")
 
 
 class UnitCast(Token):
+    __slots__ = ("unit",)
+
     unit: Unit
 
     def __init__(self, unit):
@@ -45,56 +50,116 @@ MAX_UNIT_WEIGHT = 5
 
 LATIN_ALPHABET = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
 GREEK_ALPHABET = "αβγδεφγχιηκλμνωπψρστυθ-ξ-ζΑΒΓΔΕΦΓΧΙΗΚΛΜΝΩΠΨΡΣΤΥΘ-Ξ-Ζ"
+ESCAPES = {"\\" + latin: greek for latin, greek in zip(LATIN_ALPHABET, GREEK_ALPHABET) if greek != "-"}
 
-SPECIAL_TOKENS = {
+SPECIAL_TOKENS = MappingProxyType({
     "=": SpecialToken.EQUALS,
     ":=": SpecialToken.ASSIGNMENT,
     "(": SpecialToken.LEFT_PAREN,
     ")": SpecialToken.RIGHT_PAREN,
     ",": SpecialToken.COMMA,
-}
+})
+
+# tokens of these exact types are values by themselves; testing the type avoids isinstance checks against the
+# Token ABC's subclasses, which go through ABCMeta.__instancecheck__ whenever they fail
+VALUE_TOKENS = frozenset((Output, Variable, Value))
 
 PARSER = [
-    (UnitCast.parse, re.compile(TOKEN_CAST)),
-    (Output.parse, re.compile(TOKEN_OUTPUT)),
-    (Operator.parse, re.compile(TOKEN_OPERATOR)),
-    (Variable.parse, re.compile(TOKEN_VARIABLE)),
-    (Value.parse, re.compile(TOKEN_VALUE)),
-    (SPECIAL_TOKENS.get, re.compile(TOKEN_SPECIAL)),
+    ("cast", UnitCast.parse, TOKEN_CAST),
+    ("output", Output.parse, TOKEN_OUTPUT),
+    ("operator", Operator.registry.get, TOKEN_OPERATOR),
+    ("variable", Variable.parse, TOKEN_VARIABLE),
+    ("value", Value.parse, TOKEN_VALUE),
+    ("special", SPECIAL_TOKENS.get, TOKEN_SPECIAL),
 ]
 
+# the alternatives are tried in order, so the first matching token type wins; \Z matches trailing whitespace
+TOKEN_REGEX = re.compile(r"\s*(?:" + "|".join(f"(?P<{name}>{regex})" for name, _, regex in PARSER) + r"|\Z)")
+TOKEN_PARSERS = {name: prec for name, prec, _ in PARSER}
+
 
 def _tokenize_input(text, context):
     pos = 0
-    while pos < len(text):
-        if text[pos].isspace():
-            pos += 1
-            continue
-        for prec, regex in PARSER:
-            match = regex.match(text, pos)
-            if match is not None:
-                yield prec(match.group(0), context)
-                pos = match.end()
-                break
-        else:
+    while True:
+        match = TOKEN_REGEX.match(text, pos)
+        if match is None:
             raise MathParseError("invalid syntax at '" + text[:10] + "'")
+        if match.lastgroup is None:
+            return
+        yield TOKEN_PARSERS[match.lastgroup](match.group(match.lastgroup), context)
+        pos = match.end()
 
 
 def _replace_escape(match):
-    char = match.group(0)[1]
     try:
-        greek_char = GREEK_ALPHABET[LATIN_ALPHABET.index(char)]
-        if greek_char == "-":
-            raise ValueError
-        return greek_char
-    except ValueError:
-        raise MathParseError("unknown escape \\" + char) from None
+        return ESCAPES[match.group(0)]
+    except KeyError:
+        raise MathParseError("unknown escape " + match.group(0)) from None
 
 
 def replace_escapes(text):
+    if "\\" not in text:
+        return text
     return ESCAPE_REGEX.sub(_replace_escape, text)
 
 
+def _new_levels():
+    """Creates the subexpression and operator lists for precedence levels 0 (the result) to POWER."""
+    return [([], []) for _ in range(OpPrecedence.POWER + 1)]
+
+
+def _reduce_levels(levels, prec):
+    """Combines the subexpressions at each precedence level above prec into a subexpression of the level below it."""
+    for level in range(OpPrecedence.POWER, prec, -1):
+        subexprs, operators = levels[level]
+        if len(subexprs) == 1:
+            expr = subexprs[0]
+        elif level == OpPrecedence.POWER:
+            expr = PowerExpression(subexprs)
+        else:
+            expr = OperatorExpression(subexprs, operators)
+        levels[level] = ([], [])
+        levels[level - 1][0].append(expr)
+    return levels
+
+
+def _close_group(groups):
+    """Finishes the innermost group and adds it as a value to the group containing it, if any."""
+    negations, levels = groups.pop()
+    (value,), _ = _reduce_levels(levels, 0)[0]
+    for _ in range(negations):
+        value = UnaryMinus.create(value)
+    if groups:
+        groups[-1][1][OpPrecedence.POWER][0].append(value)
+    return value
+
+
+def _parse_operator(tokens, pos, groups):
+    """Parses the operator after a value at pos, closing the groups ended by right parentheses before it.
+
+    Returns the position after the operator. If the expression ended instead, all groups are closed and the position
+    of the end of the expression is returned along with the whole expression.
+    """
+    while True:
+        token = tokens[pos] if pos < len(tokens) else None
+        # most values are followed by an operator, so check for that first
+        if isinstance(token, Operator):
+            levels = _reduce_levels(groups[-1][1], token.prec)
+            levels[token.prec][1].append(token)
+            return pos + 1, None
+        if token is None or isinstance(token, UnitCast):
+            # unclosed parentheses are closed at the end of the expression
+            while groups:
+                expression = _close_group(groups)
+            return pos, expression
+        if token is not SpecialToken.RIGHT_PAREN:
+            raise MathParseError("found " + token.token_name() + " when expecting an operator")
+        if len(groups) == 1:
+            raise MathParseError("unmatched parenthesis")
+        pos += 1
+        _close_group(groups)
+
+
 def parse_input(text, context):
     # normalize µ (U+00B5 MICRO SIGN) to μ (U+03BC GREEK SMALL LETTER MU)
     text = text.replace("\xB5", "\u03BC")
@@ -110,64 +175,53 @@ def parse_input(text, context):
         pos += 2
     start = pos
 
-    def parse_primary():
-        nonlocal pos
-        if pos >= len(tokens):
-            raise MathParseError("missing value at end of line")
-        if isinstance(tokens[pos], Operator):
-            if tokens[pos].is_unary:
-                pos += 1
-                return UnaryMinus.create(parse_primary())
-            elif pos == start:
-                if not context.features[Feature.CONT] or not context.outputs:
-                    raise MathParseError("missing value before " + tokens[pos].token_name())
-                else:
-                    return context.outputs[-1]
-            else:
-                raise MathParseError("found " + tokens[pos].token_name() + " when expecting a value")
-        elif isinstance(tokens[pos], SpecialToken):
-            if tokens[pos] is SpecialToken.LEFT_PAREN:
-                pos += 1
-                return parse_recursive(OpPrecedence.ADD, True, True)
-            else:
-                raise MathParseError("found " + tokens[pos].token_name() + " when expecting a value")
-        elif isinstance(tokens[pos], UnitCast):
-            raise MathParseError("found " + tokens[pos].token_name() + " when expecting a value")
-        else:
-            pos += 1
-            return tokens[pos - 1]
+    def parse_value():
+        """Parses a value and the unary minuses before it.
 
-    def parse_recursive(prec, allow_paren, consume_paren):
+        Returns None if a left parenthesis was found instead, after opening a new group for it.
+        """
         nonlocal pos
-        if prec > OpPrecedence.POWER:
-            return parse_primary()
-        subexprs = [parse_recursive(prec + 1, allow_paren, False)]
-        operators = []
-        while pos < len(tokens):
-            if tokens[pos] is SpecialToken.RIGHT_PAREN:
-                if not allow_paren:
-                    raise MathParseError("unmatched parenthesis")
-                if consume_paren:
+        negations = 0
+        while True:
+            if pos >= len(tokens):
+                raise MathParseError("missing value at end of line")
+            token = tokens[pos]
+            if type(token) in VALUE_TOKENS:
+                value = token
+                pos += 1
+            elif isinstance(token, Operator):
+                if token.is_unary:
+                    negations += 1
                     pos += 1
-                break
-            elif isinstance(tokens[pos], Operator):
-                if tokens[pos].prec < prec:
-                    break
-                assert tokens[pos].prec == prec
-                operators.append(tokens[pos])
+                    continue
+                if pos == start:
+                    if not context.features[Feature.CONT] or not context.outputs:
+                        raise MathParseError("missing value before " + token.token_name())
+                    else:
+                        value = context.outputs[-1]
+                else:
+                    raise MathParseError("found " + token.token_name() + " when expecting a value")
+            elif token is SpecialToken.LEFT_PAREN:
+                groups.append((negations, _new_levels()))
                 pos += 1
-                subexprs.append(parse_recursive(prec + 1, allow_paren, False))
-            elif isinstance(tokens[pos], UnitCast):
-                break
+                return None
             else:
-                raise MathParseError("found " + tokens[pos].token_name() + " when expecting an operator")
-        if len(subexprs) == 1:
-            return subexprs[0]
-        if operators[0].prec == OpPrecedence.POWER:
-            return PowerExpression(subexprs)
-        return OperatorExpression(subexprs, operators)
+                raise MathParseError("found " + token.token_name() + " when expecting a value")
+            for _ in range(negations):
+                value = UnaryMinus.create(value)
+            return value
+
+    # the whole input and each parenthesized subexpression being parsed form a group, consisting of the unary minuses
+    # before it and the subexpressions and operators found so far at each precedence level
+    groups = [(0, _new_levels())]
+    expression = None
+    while groups:
+        value = parse_value()
+        if value is None:
+            continue
+        groups[-1][1][OpPrecedence.POWER][0].append(value)
+        pos, expression = _parse_operator(tokens, pos, groups)
 
-    expression = parse_recursive(OpPrecedence.ADD, False, False)
     cast = None
 
     if pos < len(tokens):
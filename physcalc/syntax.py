@@ -7,8 +7,14 @@ PART_POSITIVE_DECIMAL = r"(?:\d+(?:\.\d*)?|\.\d+)"
 PART_DECIMAL = r"-?" + PART_POSITIVE_DECIMAL
 PART_POSITIVE_FRACTION = r"\d+(?:/\d+)?"
 PART_FRACTION = r"-?" + PART_POSITIVE_FRACTION
-PART_POSITIVE_NUMBER = r"\d+(?:/\d+|\.\d*)?|\.\d+"
-PART_NUMBER = r"-?(?:" + PART_POSITIVE_NUMBER + r")"
+# the kinds of numbers a value can start with; fractions and decimals are tried before integers, which they begin with
+PART_NUMBER_FRACTION = r"\d+/\d+"
+PART_NUMBER_DECIMAL = r"\d+\.\d*|\.\d+"
+PART_NUMBER_INTEGER = r"\d+"
+PART_POSITIVE_NUMBER = PART_NUMBER_FRACTION + r"|" + PART_NUMBER_DECIMAL + r"|" + PART_NUMBER_INTEGER
+# matches an optionally negative PART_POSITIVE_NUMBER, with a named group for the kind of number
+PART_NUMBER_KINDS = (r"(?P<fraction>-?(?:" + PART_NUMBER_FRACTION + r"))|(?P<decimal>-?(?:" + PART_NUMBER_DECIMAL
+                     + r"))|(?P<integer>-?(?:" + PART_NUMBER_INTEGER + r"))")
 
 PART_VARIABLE_NAME = r"[A-Za-z\u0370-\u03FF]+"
 PART_SUBSCRIPT_CONTENT = r"[A-Za-z0-9\u0370-\u03FF]+"
@@ -16,9 +22,12 @@ PART_SUBSCRIPT_CONTENT = r"[A-Za-z0-9\u0370-\u03FF]+"
 PART_POWER = r"(?:\^|\*\*)" + PART_DECIMAL + r"|\u207B?[\xB2\xB3\xB9\u2070\u2074-\u2079]+"
 PART_SUBSCRIPT = r"_" + PART_SUBSCRIPT_CONTENT
 
-PART_UNIT_POWER = PART_VARIABLE_NAME + r"(?:" + PART_POWER + r")?"
-PART_UNIT_POWERS = PART_UNIT_POWER + r"(?:\s+" + PART_UNIT_POWER + r")*"
-PART_UNIT = r"(?:" + PART_UNIT_POWERS + r")+(?:\s*/\s*(?:" + PART_UNIT_POWERS + r")+)?"
+# unit names with powers, separated by whitespace or directly following a power; written so that each string can only
+# be split into unit names in one way, to avoid exponential backtracking on inputs that fail to match
+PART_GROUPED_POWER = r"(?:" + PART_POWER + r")"
+PART_UNIT_POWERS = (PART_VARIABLE_NAME + r"(?:" + PART_GROUPED_POWER + r"?\s+" + PART_VARIABLE_NAME + r"|"
+                    + PART_GROUPED_POWER + PART_VARIABLE_NAME + r")*" + PART_GROUPED_POWER + r"?")
+PART_UNIT = PART_UNIT_POWERS + r"(?:\s*/\s*" + PART_UNIT_POWERS + r")?"
 
 TOKEN_CAST = r"!as\s+" + PART_UNIT
 TOKEN_OUTPUT = r"\[\d+\]"
@@ -30,6 +39,8 @@ TOKEN_SPECIAL = r":?=|[(),]"
 
 
 class Token(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def token_name(self):
         pass
@@ -1,14 +1,14 @@
 import math
-import re
 from collections import Counter, OrderedDict, defaultdict
 from enum import IntEnum
 from fractions import Fraction
-from itertools import groupby, combinations, permutations
+from functools import lru_cache
+from itertools import groupby
 from numbers import Real
 from typing import FrozenSet
 from typing import Iterable, Tuple, List, Dict, TypeVar, Optional, Set, Mapping, DefaultDict
 
-from physcalc.util import (MathParseError, MathEvalError, parse_power, generate_sup_power, iterlen, ensure_real,
+from physcalc.util import (MathParseError, MathEvalError, parse_power, generate_sup_power, ensure_real,
                            ensure_int)
 
 T = TypeVar("T")
@@ -24,6 +24,9 @@ class BaseUnit(IntEnum):
     CANDELA = 7
 
 
+# iterating an Enum class goes through Python-level code, so keep the members in a tuple for the hot paths
+BASE_UNITS = tuple(BaseUnit)
+
 BASE_UNIT_NAMES = {
     BaseUnit.METER: "m",
     BaseUnit.KILOGRAM: "kg",
@@ -49,14 +52,14 @@ MUL_PREFIXES = OrderedDict((
     ("d", Fraction(1, 10)),
     ("c", Fraction(1, 100)),
     ("m", Fraction(1, 1000)),
-    ("μ", Fraction(1, 1000) ** 2),
-    ("u", Fraction(1, 1000) ** 2),
-    ("n", Fraction(1, 1000) ** 3),
-    ("p", Fraction(1, 1000) ** 4),
-    ("f", Fraction(1, 1000) ** 5),
-    ("a", Fraction(1, 1000) ** 6),
-    ("z", Fraction(1, 1000) ** 7),
-    ("y", Fraction(1, 1000) ** 8),
+    ("μ", Fraction(1, 1000 ** 2)),
+    ("u", Fraction(1, 1000 ** 2)),
+    ("n", Fraction(1, 1000 ** 3)),
+    ("p", Fraction(1, 1000 ** 4)),
+    ("f", Fraction(1, 1000 ** 5)),
+    ("a", Fraction(1, 1000 ** 6)),
+    ("z", Fraction(1, 1000 ** 7)),
+    ("y", Fraction(1, 1000 ** 8)),
 ))
 
 # by default, non-multiplicative units won't be prefixed with the non-1000^n prefixes
@@ -66,41 +69,36 @@ ALL_DISALLOWED_PREFIXES = frozenset(MUL_PREFIXES.keys()) - frozenset(("",))
 
 DISALLOWED_PREFIXES: "DefaultDict[Unit, FrozenSet[str]]" = defaultdict(lambda: ALL_DISALLOWED_PREFIXES)
 PREFIX_POWER: "DefaultDict[Unit, int]" = defaultdict(lambda: 1)
-
-WHITESPACE_RE = re.compile(r"\s+")
+# canonical instances of the base unit tuples used as unit parts
+SIGNATURES: "Dict[Tuple[BaseUnit, ...], Tuple[BaseUnit, ...]]" = {}
 
 
+@lru_cache(maxsize=512)
 def _parse_multiplied_unit(unit_name: str) -> "Unit":
     """Parses a unit name with optional multiplier."""
-    for prefix, prefix_mul in MUL_PREFIXES.items():
-        for name, unit in Unit.name_registry.items():
-            if unit_name == prefix + name:
-                return unit * prefix_mul
-    raise MathParseError(f"unknown unit {unit_name}")
+    try:
+        _, prefix_mul, unit = Unit.prefixed_registry[unit_name]
+    except KeyError:
+        raise MathParseError(f"unknown unit {unit_name}") from None
+    return unit * prefix_mul
 
 
 def _parse_unit_half(text) -> "Tuple[Unit, Mapping[str, int]]":
     """Parses unit names separated by whitespace into a single unit and a name list."""
     total_unit = NO_UNIT
     total_names = Counter()
-    parts = WHITESPACE_RE.split(text)
+    parts = text.split()
     if parts == ["1"]:
         return total_unit, total_names
     for part in parts:
-        if not part:
-            continue
         unit_name, power = parse_power(part)
         unit = _parse_multiplied_unit(unit_name)
         try:
             power = int(power)
         except ValueError:
             raise MathParseError(f"invalid power {power}") from None
-        for _ in range(power):
-            total_unit *= unit
-            total_names[unit_name] += 1
-        for _ in range(-power):
-            total_unit /= unit
-            total_names[unit_name] -= 1
+        total_unit *= unit ** power
+        total_names[unit_name] += power
     return total_unit, total_names
 
 
@@ -111,58 +109,87 @@ def _cancel_unit_parts(num: Iterable[T], denom: Iterable[T]) -> Tuple[Tuple[T, .
     num_list = []
     denom_list = []
     for item, count in sorted(counts.items()):
-        for _ in range(count):
-            num_list.append(item)
-        for _ in range(-count):
-            denom_list.append(item)
+        # repeating a list a negative number of times yields an empty list
+        num_list.extend([item] * count)
+        denom_list.extend([item] * -count)
     return tuple(num_list), tuple(denom_list)
 
 
+@lru_cache(maxsize=4096)
+def _cancel_base_units(num: Tuple[BaseUnit, ...],
+                       denom: Tuple[BaseUnit, ...]) -> Tuple[Tuple[BaseUnit, ...], Tuple[BaseUnit, ...]]:
+    """Simplifies a numerator-denumerator pair of base units.
+
+    Equivalent to _cancel_unit_parts, but counts the powers in a list indexed by base unit instead of a Counter.
+    Results are cached, as units are mostly combined from the same few parts.
+    """
+    powers = [0] * (len(BASE_UNITS) + 1)
+    for unit in num:
+        powers[unit] += 1
+    for unit in denom:
+        powers[unit] -= 1
+    num_list = []
+    denom_list = []
+    for unit in BASE_UNITS:
+        num_list.extend([unit] * powers[unit])
+        denom_list.extend([unit] * -powers[unit])
+    num_tuple = tuple(num_list)
+    denom_tuple = tuple(denom_list)
+    # share one tuple per distinct part list, so that comparing parts of different units usually succeeds on identity
+    return SIGNATURES.setdefault(num_tuple, num_tuple), SIGNATURES.setdefault(denom_tuple, denom_tuple)
+
+
 def _generate_base_name_half(part: Iterable[str]) -> Tuple[str, int]:
-    """Generates a unit name with powers from a sorted list of unit names."""
-    if not part:
+    """Generates a unit name with powers from a list of unit names, in order of first appearance."""
+    counts = Counter(part)
+    if not counts:
         return "", 1
-    units = []
-    weight = 1
-    for unit, power in groupby(part):
-        units.append(unit + generate_sup_power(iterlen(power)))
-        weight *= 2
-    return " ".join(units), weight
+    units = [unit + generate_sup_power(power) for unit, power in counts.items()]
+    return " ".join(units), 2 ** len(counts)
 
 
 def _multiply_list_by_frac(lst, frac):
-    """Multiplies a list of base units by a fraction, ensuring that no fractional powers result."""
-    out = []
+    """Multiplies a sorted list of base units by a fraction, ensuring that no fractional powers result."""
     if len(lst) % frac.denominator:
         raise ValueError(f"number of base units in unit not divisible by {frac.denominator}")
-    for i in range(0, len(lst), frac.denominator):
-        if any(lst[i] != lst[i + j] for j in range(frac.denominator)):
-            raise ValueError(f"number of {BASE_UNIT_NAMES[lst[i]]} in unit not divisible by {frac.denominator}")
-        for _ in range(frac.numerator):
-            out.append(lst[i])
-    return out
+    out = []
+    for unit, run in groupby(lst):
+        count = len(list(run))
+        if count % frac.denominator:
+            raise ValueError(f"number of {BASE_UNIT_NAMES[unit]} in unit not divisible by {frac.denominator}")
+        out.extend([unit] * (count // frac.denominator * frac.numerator))
+    return tuple(out)
 
 
 class Unit:
     part_registry: "Dict[tuple, Unit]" = {}
     name_registry: "Dict[str, Unit]" = {}
+    # all prefixed unit names, with the index of the prefix in MUL_PREFIXES, the prefix multiplier and the unit
+    prefixed_registry: "Dict[str, Tuple[int, Fraction, Unit]]" = {}
     output_units: "Set[Unit]" = set()
     named_units: "List[Unit]" = []
+    # output units by their (num, denom), and names for products and quotients of two output units by their (num, denom)
+    output_index: "Dict[Tuple[tuple, tuple], List[Unit]]" = defaultdict(list)
+    name_index: "Dict[Tuple[tuple, tuple], List[Tuple[str, int]]]" = defaultdict(list)
+    generated_names: "Dict[Tuple[tuple, tuple], str]" = {}
+
+    __slots__ = ("_name", "_num", "_denom", "output_weight", "quantity_name", "multiplier", "_hash")
 
-    specific_name: bool
     _name: Optional[str]
     output_weight: int
     quantity_name: Optional[str]
     multiplier: Real
 
     def __init__(self, specific_name: Optional[str], num, denom, output_weight: int = 1000, quantity_name: Optional[str] = None, multiplier: Real = 1):
-        self.specific_name = specific_name is not None
-        self._name = specific_name
+        # dimensionless units are always named "", so they never need a generated name
+        self._name = "" if specific_name is None and not num and not denom else specific_name
         self._num = num
         self._denom = denom
         self.output_weight = output_weight
         self.quantity_name = quantity_name
         self.multiplier = multiplier
+        # units are immutable, so the hash of their parts is computed once
+        self._hash = hash((num, denom, multiplier))
 
     def _register_key(self):
         key = (self._num, self._denom, self.multiplier)
@@ -175,8 +202,33 @@ class Unit:
             raise ValueError(f"unit with name {self.name} already registered")
         Unit.named_units.append(self)
         if not derivative:
+            self._index_output_unit()
             Unit.output_units.add(self)
         Unit.name_registry[self.name] = self
+        for index, (prefix, prefix_mul) in enumerate(MUL_PREFIXES.items()):
+            # if a name can be read in multiple ways, the prefix listed first in MUL_PREFIXES wins
+            previous = Unit.prefixed_registry.get(prefix + self.name)
+            if previous is None or previous[0] > index:
+                Unit.prefixed_registry[prefix + self.name] = (index, prefix_mul, self)
+        # newly registered names may change the result of parsing
+        _parse_multiplied_unit.cache_clear()
+        Unit.parse.cache_clear()
+
+    def _index_output_unit(self):
+        """Adds names for the products and quotients of this unit and the existing output units to the index."""
+        # output_index keeps the output units in registration order, so tied names are indexed in a stable order
+        for (other_num, other_denom), others in Unit.output_index.items():
+            for other in others:
+                weight = self.output_weight * other.output_weight
+                Unit.name_index[_cancel_base_units(other_num + self._num, other_denom + self._denom)].append(
+                    (f"{other.name} {self.name}", weight))
+                Unit.name_index[_cancel_base_units(other_num + self._denom, other_denom + self._num)].append(
+                    (f"{other.name} / {self.name}", weight))
+                Unit.name_index[_cancel_base_units(self._num + other_denom, self._denom + other_num)].append(
+                    (f"{self.name} / {other.name}", weight))
+        Unit.output_index[(self._num, self._denom)].append(self)
+        # names generated before this unit was known may no longer be the best ones
+        Unit.generated_names.clear()
 
     def register_derivative(self, specific_name: str, multiplier: Real, disallowed_prefixes=None):
         """Creates a new derivative Unit of this Unit."""
@@ -189,7 +241,7 @@ class Unit:
     @staticmethod
     def register(specific_name: Optional[str], output_weight: int, quantity_name: str, num, denom=(), disallowed_prefixes=None, prefix_power=None):
         """Creates a new Unit with the given properties."""
-        num, denom = _cancel_unit_parts(num, denom)
+        num, denom = _cancel_base_units(num, denom)
         created = Unit(specific_name, num, denom, output_weight, quantity_name)
         created._register_key()
         if specific_name is not None:
@@ -207,7 +259,7 @@ class Unit:
         If the combination is already known, returns the previously created Unit. Otherwise, an anonymous unit is
         created and registered for this combination.
         """
-        num, denom = _cancel_unit_parts(num, denom)
+        num, denom = _cancel_base_units(num, denom)
         key = (num, denom, multiplier)
         try:
             return Unit.part_registry[key]
@@ -217,13 +269,14 @@ class Unit:
             return unit
 
     @staticmethod
+    @lru_cache(maxsize=512)
     def parse(name):
         """Parses a unit specification.
 
         The resulting unit will keep the given name and may be multiplied. To convert it to a non-multiplied unit,
-        use to_si().
+        use to_si(). Results are cached, so the returned Unit must not be modified.
         """
-        num, denom = name.split("/") if "/" in name else (name, "")
+        num, _, denom = name.partition("/")
         num, num_names = _parse_unit_half(num)
         denom, denom_names = _parse_unit_half(denom)
         num_names, denom_names = _cancel_unit_parts(num_names, denom_names)
@@ -236,13 +289,16 @@ class Unit:
     @property
     def name(self):
         if self._name is None:
-            self._name = self._generate_name()
+            # anonymous units with the same parts but different multipliers get the same name. The name is not stored
+            # in the unit, as registering new output units clears the generated names
+            key = (self._num, self._denom)
+            if key not in Unit.generated_names:
+                Unit.generated_names[key] = self._generate_name()
+            return Unit.generated_names[key]
         return self._name
 
     def _generate_name(self):
         """Generates potential names for a unit."""
-        if not self._num and not self._denom:
-            return ""
         # generate name derived from the base units that make up this unit
         basic_name, basic_weight = _generate_base_name_half(BASE_UNIT_NAMES[unit] for unit in self._num)
         if self._denom:
@@ -251,27 +307,30 @@ class Unit:
             basic_weight *= denom_weight
         results: List[Tuple[str, int]] = [(basic_name, basic_weight)]
         # generate all reasonable powers of known units
-        for test in Unit.output_units:
-            max_power = min(len(self._num), len(self._denom))
-            for power in range(-max_power, max_power + 1):
-                if 0 <= power <= 1:
-                    continue
-                if self.can_convert(test ** power):
-                    results.append((test.name + generate_sup_power(power), test.output_weight * 2))
-        # generate all products of two known units
-        for first, second in combinations(Unit.output_units, 2):
-            if self.can_convert(first * second):
-                results.append((f"{first.name} {second.name}", first.output_weight * second.output_weight))
-        # generate all quotients of two known units
-        for num, denom in permutations(Unit.output_units, 2):
-            if self.can_convert(num / denom):
-                results.append((f"{num.name} / {denom.name}", num.output_weight * denom.output_weight))
+        max_power = min(len(self._num), len(self._denom))
+        for power in range(-max_power, max_power + 1):
+            if 0 <= power <= 1:
+                continue
+            num, denom = (self._num, self._denom) if power > 0 else (self._denom, self._num)
+            try:
+                root = (_multiply_list_by_frac(num, Fraction(1, abs(power))),
+                        _multiply_list_by_frac(denom, Fraction(1, abs(power))))
+            except ValueError:
+                continue
+            for test in Unit.output_index.get(root, ()):
+                results.append((test.name + generate_sup_power(power), test.output_weight * 2))
+        # generate all products and quotients of two known units
+        results.extend(Unit.name_index.get((self._num, self._denom), ()))
         # pick the name with the minimum weight
         return min(results, key=lambda pair: pair[1])[0]
 
     def can_convert(self, other: "Unit"):
         return self._num == other._num and self._denom == other._denom
 
+    # units are immutable and from_parts returns the registered unit for each result, so arithmetic results can be
+    # reused; calculations tend to keep combining the same few units. The caches are typed to match __pow__, so a
+    # result is only reused for arguments of the same types
+    @lru_cache(maxsize=1024, typed=True)
     def __mul__(self, other):
         if isinstance(other, Real):
             return Unit.from_parts(self._num, self._denom, self.multiplier * other)
@@ -279,6 +338,7 @@ class Unit:
             return NotImplemented
         return Unit.from_parts(self._num + other._num, self._denom + other._denom, self.multiplier * other.multiplier)
 
+    @lru_cache(maxsize=1024, typed=True)
     def __truediv__(self, other):
         if not isinstance(other, Unit):
             return NotImplemented
@@ -289,9 +349,12 @@ class Unit:
             return NO_UNIT / self
         return NotImplemented
 
+    # typed, since equal powers of different types behave differently: only rational ones can be fractional. The
+    # cache looks units up by equality, so the method must not treat equal units differently
+    @lru_cache(maxsize=1024, typed=True)
     def __pow__(self, power):
         # special case for 0
-        if power == 0 or self is NO_UNIT:
+        if power == 0 or self == NO_UNIT:
             return NO_UNIT
 
         # only real powers allowed for non-empty units
@@ -327,10 +390,16 @@ class Unit:
             return True
         if not isinstance(other, Unit):
             return False
-        return self.name == other.name and self._num == other._num and self._denom == other._denom and self.multiplier == other.multiplier
+        if self._num != other._num or self._denom != other._denom or self.multiplier != other.multiplier:
+            return False
+        # anonymous units are only compared by their parts, so that comparing and hashing them never generates names.
+        # units with an explicit name equal anonymous units whose generated name matches, such as parsed units
+        if self._name is None and other._name is None:
+            return True
+        return self.name == other.name
 
     def __hash__(self):
-        return hash((self._name if self.specific_name else None, self._num, self._denom, self.multiplier))
+        return self._hash
 
     def __str__(self):
         return self.name or "1"
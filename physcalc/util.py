@@ -1,4 +1,5 @@
-from numbers import Complex
+import math
+from numbers import Complex, Rational
 
 from physcalc.context import Feature
 
@@ -21,13 +22,9 @@ class debug:  # pylint: disable=invalid-name
         return ret
 
 
-def iterlen(itr):
-    return sum(1 for _ in itr)
-
-
 SUP_CHARS = "⁰¹²³⁴⁵⁶⁷⁸⁹⁻"
-DECIMAL_TO_SUP = dict(zip(map(ord, "0123456789-"), SUP_CHARS))
-SUP_TO_DECIMAL = dict(zip(map(ord, SUP_CHARS), "0123456789-"))
+DECIMAL_TO_SUP = str.maketrans("0123456789-", SUP_CHARS)
+SUP_TO_DECIMAL = str.maketrans(SUP_CHARS, "0123456789-")
 
 
 def generate_sup_power(power):
@@ -68,6 +65,27 @@ def ensure_int(num: Complex):
     raise ValueError(f"can't convert {num} to integer")
 
 
+def _split_scientific(num):
+    """Splits a nonzero real number into a mantissa in [1, 10) and a power of ten."""
+    # estimate the power using log10, then correct it in case of rounding errors. rationals are estimated from their
+    # parts, as converting them to float would underflow or overflow outside the float range
+    if isinstance(num, Rational):
+        power = math.floor(math.log10(abs(num.numerator)) - math.log10(num.denominator))
+    else:
+        power = math.floor(math.log10(abs(num)))
+    if power < 0:
+        while abs(num * 10 ** -power) < 1:
+            power -= 1
+        while abs(num * 10 ** (-power - 1)) >= 1:
+            power += 1
+        return num * 10 ** -power, power
+    while abs(num / 10 ** power) >= 10:
+        power += 1
+    while power > 0 and abs(num / 10 ** (power - 1)) < 10:
+        power -= 1
+    return num / 10 ** power, power
+
+
 def scientific(num, imag=""):
     if num.imag != 0:
         if num.real == 0:
@@ -76,19 +94,10 @@ def scientific(num, imag=""):
             return "(" + scientific(num.real) + scientific(num.imag, "j") + ")"
         return "(" + scientific(num.real) + "+" + scientific(num.imag, "j") + ")"
     num = num.real
-    if num == 0 or 0.1 <= abs(num) < 1000000:
+    if num == 0 or 0.1 <= abs(num) < 1000000 or isinstance(num, float) and not math.isfinite(num):
         return str(float(num)) + imag
-    power = 0
-    mul = 1
-    if abs(num) < 10:
-        while abs(num * mul) < 1:
-            mul *= 10
-            power -= 1
-        return str(float(num * mul)) + "\xB710" + generate_sup_power(power) + ("\xB7" + imag if imag else "")
-    while abs(num / mul) >= 10:
-        mul *= 10
-        power += 1
-    return str(float(num / mul)) + "\xB710" + generate_sup_power(power) + ("\xB7" + imag if imag else "")
+    mantissa, power = _split_scientific(num)
+    return str(float(mantissa)) + "\xB710" + generate_sup_power(power) + ("\xB7" + imag if imag else "")
 
 
 def stringify_frac(frac, context):
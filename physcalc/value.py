@@ -1,21 +1,31 @@
 import math
 import re
+import sys
 from abc import ABC, abstractmethod
 from fractions import Fraction
+from functools import lru_cache
+from itertools import chain
 from numbers import Rational
-from typing import List, Optional
+from typing import List, Optional, Set, Tuple
 
 from physcalc.context import Context, Feature
 from physcalc.operator import (OpPrecedence, OPERATOR_ADD, OPERATOR_SUBTRACT, OPERATOR_MULTIPLY, OPERATOR_DIVIDE,
                                Operator)
-from physcalc.syntax import PART_NUMBER, Token
+from physcalc.syntax import PART_NUMBER_KINDS, Token
 from physcalc.unit import Unit, NO_UNIT, MUL_PREFIXES, KILOGRAM, GRAM, DISALLOWED_PREFIXES, PREFIX_POWER
 from physcalc.util import MathParseError, MathEvalError, scientific, stringify_frac
 
-NUMBER_RE = re.compile(PART_NUMBER)
+NUMBER_RE = re.compile(PART_NUMBER_KINDS)
+NUMBER_PARSERS = {
+    "fraction": Fraction,
+    "decimal": float,
+    "integer": int,
+}
 
 
 class ExpressionPart(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def evaluate(self, _1, _2):
         pass
@@ -74,7 +84,17 @@ def _prefix_cost(value):
     return math.log10(value)
 
 
+@lru_cache(maxsize=256)
+def _prefix_multipliers(unit: Unit):
+    """Lists the SI prefixes allowed for a unit, with the exact and float multipliers they apply to its values."""
+    power = PREFIX_POWER[unit]
+    return tuple((prefix, MUL_PREFIXES[prefix] ** power, float(MUL_PREFIXES[prefix] ** power))
+                 for prefix in MUL_PREFIXES if prefix not in DISALLOWED_PREFIXES[unit])
+
+
 class Value(ExpressionPart, Token):
+    __slots__ = ("number", "unit")
+
     def __init__(self, number, unit):
         if isinstance(unit, tuple):
             self.number = number * unit[0]
@@ -95,11 +115,14 @@ class Value(ExpressionPart, Token):
         if unit == KILOGRAM:  # special handling for kg -> g
             unit = GRAM
             value *= 1000
-        disallowed = DISALLOWED_PREFIXES[unit]
-        allowed = [prefix for prefix in MUL_PREFIXES if prefix not in disallowed]
-        power = PREFIX_POWER[unit]
-        optimal_prefix = min(allowed, key=lambda prefix: _prefix_cost(value / MUL_PREFIXES[prefix] ** power))
-        value /= MUL_PREFIXES[optimal_prefix] ** power
+        prefixes = _prefix_multipliers(unit)
+        if isinstance(value, float):
+            # dividing a float by a Fraction converts the Fraction to float, so do that conversion only once
+            best = min(prefixes, key=lambda entry: _prefix_cost(value / entry[2]))
+        else:
+            best = min(prefixes, key=lambda entry: _prefix_cost(value / entry[1]))
+        optimal_prefix, prefix_mul, _ = best
+        value /= prefix_mul
         if context is not None and context.features[Feature.FRAC] and isinstance(value, Rational):
             value = stringify_frac(value, context)
         else:
@@ -114,14 +137,14 @@ class Value(ExpressionPart, Token):
 
     def __add__(self, other):
         if isinstance(other, Value):
-            if other.unit != self.unit:
+            if other.unit is not self.unit and other.unit != self.unit:
                 raise MathEvalError("unit mismatch: cannot add " + str(self.unit) + " to " + str(other.unit))
             return Value(self.number + other.number, self.unit)
         return super().__add__(other)
 
     def __sub__(self, other):
         if isinstance(other, Value):
-            if other.unit != self.unit:
+            if other.unit is not self.unit and other.unit != self.unit:
                 raise MathEvalError("unit mismatch: cannot subtract " + str(other.unit) + " from " + str(self.unit))
             return Value(self.number - other.number, self.unit)
         return super().__sub__(other)
@@ -153,15 +176,8 @@ class Value(ExpressionPart, Token):
             number = 1
             unit_start = 0
         else:
-            num = num_match.group(0)
+            number = NUMBER_PARSERS[num_match.lastgroup](num_match.group(0))
             unit_start = num_match.end()
-            if "/" in num:
-                num, denom = num_match.group(0).split("/")
-                number = Fraction(int(num), int(denom))
-            elif "." in num:
-                number = float(num)
-            else:
-                number = int(num)
         unit_mul, unit = Unit.parse(text[unit_start:]).to_si()
         return Value(number * unit_mul, unit)
 
@@ -177,9 +193,40 @@ def _stringify_expr(expr: ExpressionPart, max_paren_prec: OpPrecedence, context:
     return expr.stringify(context, unit)
 
 
+def _evaluate_nested(expr: ExpressionPart, context: Context, var_stack: Set[str]):
+    """Evaluates an operator, power or unary minus expression without recursing into its nested subexpressions.
+
+    Each of these expressions has an evaluate_steps generator, which yields the subexpressions it needs the values of
+    in order and returns its own value. The generators of the expressions being evaluated are kept in a list, so deeply
+    nested expressions are not limited by the recursion limit.
+    """
+    pending = []
+    steps = expr.evaluate_steps()
+    value = None
+    while True:
+        try:
+            subexpr = steps.send(value)
+        except StopIteration as stop:
+            if not pending:
+                return stop.value
+            steps = pending.pop()
+            value = stop.value
+            continue
+        if isinstance(subexpr, Value):
+            value = subexpr
+        elif isinstance(subexpr, NESTED_EXPRESSIONS):
+            pending.append(steps)
+            steps = subexpr.evaluate_steps()
+            value = None
+        else:
+            value = subexpr.evaluate(context, var_stack)
+
+
 class OperatorExpression(ExpressionPart):
-    operators: List[Operator]
-    subexprs: List[ExpressionPart]
+    __slots__ = ("operators", "subexprs", "prec")
+
+    operators: Tuple[Operator, ...]
+    subexprs: Tuple[ExpressionPart, ...]
     prec: OpPrecedence
 
     def __init__(self, subexprs, operators):
@@ -188,43 +235,49 @@ class OperatorExpression(ExpressionPart):
         self.prec = operators[0].prec
         assert self.prec in [OpPrecedence.ADD, OpPrecedence.MULTIPLY]
         assert all(oper.prec == self.prec for oper in operators)
+        # the lists are built locally and frozen, so flattening never modifies the expressions being flattened
         if isinstance(subexprs[0], OperatorExpression) and subexprs[0].prec == self.prec:
-            self.subexprs = subexprs[0].subexprs
-            self.operators = subexprs[0].operators
+            new_subexprs = list(subexprs[0].subexprs)
+            new_operators = list(subexprs[0].operators)
         else:
-            self.subexprs = subexprs[:1]
-            self.operators = []
+            new_subexprs = [subexprs[0]]
+            new_operators = []
         for expr, oper in zip(subexprs[1:], operators):
             if isinstance(expr, UnaryMinus):
                 if self.prec == OpPrecedence.MULTIPLY:
                     expr = expr.subexpr
-                    self.subexprs[0] = UnaryMinus.create(self.subexprs[0])
+                    new_subexprs[0] = UnaryMinus.create(new_subexprs[0])
                 elif self.prec == OpPrecedence.ADD:
                     oper = oper.inverse
                     expr = expr.subexpr
             if isinstance(expr, OperatorExpression) and expr.prec == self.prec:
-                self.operators.append(oper)
-                self.operators.extend(oper.distribute(expr_oper) for expr_oper in expr.operators)
-                self.subexprs.extend(expr.subexprs)
+                new_operators.append(oper)
+                new_operators.extend(oper.distribute(expr_oper) for expr_oper in expr.operators)
+                new_subexprs.extend(expr.subexprs)
             elif isinstance(expr, OperatorExpression) and expr.prec == OpPrecedence.MULTIPLY and self.prec == OpPrecedence.ADD and isinstance(expr.subexprs[0], UnaryMinus):
-                self.operators.append(OPERATOR_SUBTRACT.distribute(oper))
-                self.subexprs.append(OperatorExpression([UnaryMinus.create(expr.subexprs[0]), *expr.subexprs[1:]], expr.operators))
+                new_operators.append(OPERATOR_SUBTRACT.distribute(oper))
+                new_subexprs.append(OperatorExpression([UnaryMinus.create(expr.subexprs[0]), *expr.subexprs[1:]], expr.operators))
             else:
-                self.operators.append(oper)
-                self.subexprs.append(expr)
+                new_operators.append(oper)
+                new_subexprs.append(expr)
+        self.subexprs = tuple(new_subexprs)
+        self.operators = tuple(new_operators)
 
     def stringify(self, context, unit):
-        return _stringify_expr(self.subexprs[0], self.prec, context, unit) + "".join(
-            " " + oper.name + " " + _stringify_expr(expr, self.prec, context, unit)
-            for expr, oper in zip(self.subexprs[1:], self.operators)
-        )
+        parts = [_stringify_expr(self.subexprs[0], self.prec, context, unit)]
+        for expr, oper in zip(self.subexprs[1:], self.operators):
+            parts.extend((" ", oper.name, " ", _stringify_expr(expr, self.prec, context, unit)))
+        return "".join(parts)
 
     def evaluate(self, context, var_stack):
+        return _evaluate_nested(self, context, var_stack)
+
+    def evaluate_steps(self):
         accum_value = None
         rest_operators = []
         rest_subexprs = []
-        for oper, expr in zip([self.operators[0].positive] + self.operators, self.subexprs):
-            expr_value = expr.evaluate(context, var_stack)
+        for oper, expr in zip(chain((self.operators[0].positive,), self.operators), self.subexprs):
+            expr_value = yield expr
             if isinstance(expr_value, Value):
                 if accum_value is None:
                     accum_value = Value(*oper.identity(expr_value))
@@ -241,20 +294,25 @@ class OperatorExpression(ExpressionPart):
 
 
 class PowerExpression(ExpressionPart):
-    subexprs: List[ExpressionPart]
+    __slots__ = ("subexprs",)
+
+    subexprs: Tuple[ExpressionPart, ...]
 
     def __init__(self, subexprs: List[ExpressionPart]):
-        self.subexprs = subexprs
+        self.subexprs = tuple(subexprs)
 
     def stringify(self, context, unit):
-        return " ^ ".join(_stringify_expr(expr, OpPrecedence.POWER, context, unit) for expr in self.subexprs)
+        return " ^ ".join([_stringify_expr(expr, OpPrecedence.POWER, context, unit) for expr in self.subexprs])
 
     def evaluate(self, context, var_stack):
-        accum_value = self.subexprs[-1].evaluate(context, var_stack)
+        return _evaluate_nested(self, context, var_stack)
+
+    def evaluate_steps(self):
+        accum_value = yield self.subexprs[-1]
         if not isinstance(accum_value, Value):
             return self
         for expr in self.subexprs[-2::-1]:
-            expr_value = expr.evaluate(context, var_stack)
+            expr_value = yield expr
             if not isinstance(expr_value, Value):
                 return self
             accum_value = expr_value ** accum_value
@@ -262,6 +320,8 @@ class PowerExpression(ExpressionPart):
 
 
 class UnaryMinus(ExpressionPart):
+    __slots__ = ("subexpr",)
+
     subexpr: ExpressionPart
 
     def __init__(self, subexpr):
@@ -271,7 +331,11 @@ class UnaryMinus(ExpressionPart):
         return "-" + _stringify_expr(self.subexpr, OpPrecedence.POWER, context, unit)
 
     def evaluate(self, context, var_stack):
-        return -self.subexpr.evaluate(context, var_stack)
+        return _evaluate_nested(self, context, var_stack)
+
+    def evaluate_steps(self):
+        value = yield self.subexpr
+        return -value
 
     @staticmethod
     def create(subexpr: ExpressionPart):
@@ -279,16 +343,22 @@ class UnaryMinus(ExpressionPart):
             return subexpr.subexpr
         if isinstance(subexpr, OperatorExpression):
             if subexpr.prec == OpPrecedence.ADD:
-                subexprs = [UnaryMinus.create(subexpr.subexprs[0])] + subexpr.subexprs[1:]
+                subexprs = [UnaryMinus.create(subexpr.subexprs[0]), *subexpr.subexprs[1:]]
                 operators = [OPERATOR_SUBTRACT.distribute(oper) for oper in subexpr.operators]
                 return OperatorExpression(subexprs, operators)
             if subexpr.prec == OpPrecedence.MULTIPLY:
-                subexprs = [UnaryMinus.create(subexpr.subexprs[0])] + subexpr.subexprs[1:]
+                subexprs = [UnaryMinus.create(subexpr.subexprs[0]), *subexpr.subexprs[1:]]
                 return OperatorExpression(subexprs, subexpr.operators)
         return UnaryMinus(subexpr)
 
 
+# expressions evaluated by _evaluate_nested
+NESTED_EXPRESSIONS = (OperatorExpression, PowerExpression, UnaryMinus)
+
+
 class Variable(ExpressionPart, Token):
+    __slots__ = ("name",)
+
     name: str
 
     def __init__(self, name: str):
@@ -301,22 +371,23 @@ class Variable(ExpressionPart, Token):
         return "variable " + self.name
 
     def evaluate(self, context, var_stack):
+        # prevent stack overflows in case of self-referential expressions
         if self.name in var_stack or self.name not in context.variables:
             return self
-        value = context.variables[self.name]
-        # prevent stack overflows in case of self-referential expressions
-        if self.name not in var_stack:
-            var_stack.append(self.name)
-            value = value.evaluate(context, var_stack)
-            var_stack.pop()
+        var_stack.add(self.name)
+        value = context.variables[self.name].evaluate(context, var_stack)
+        var_stack.discard(self.name)
         return value
 
     @staticmethod
     def parse(text, _):
-        return Variable(text)
+        # names are used as keys to context.variables on every evaluation
+        return Variable(sys.intern(text))
 
 
 class Output(ExpressionPart, Token):
+    __slots__ = ("index",)
+
     index: int
 
     def __init__(self, index: int):
@@ -0,0 +1,6 @@
+from physcalc import parser
+
+
+def evaluate(context, line):
+    _, code, _ = parser.parse_input(line, context)
+    return code.evaluate(context, set())
@@ -0,0 +1,23 @@
+import cmath
+import math
+import unittest
+
+from physcalc.context import Context
+from physcalc.unit import NO_UNIT
+from tests.helpers import evaluate
+
+
+class MathConstantsTest(unittest.TestCase):
+    def test_raise_to_complex_power(self):
+        result = evaluate(Context(), "e ^ (j * pi)")
+        self.assertIs(result.unit, NO_UNIT)
+        self.assertTrue(cmath.isclose(result.number, -1, abs_tol=1e-12))
+
+    def test_use_as_exponent(self):
+        result = evaluate(Context(), "2 ^ pi")
+        self.assertIs(result.unit, NO_UNIT)
+        self.assertAlmostEqual(result.number, 2 ** math.pi)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+
+from physcalc.constants import VARS
+from physcalc.context import Context
+from physcalc.unit import Unit, NO_UNIT, METER, SECOND, KELVIN, HERTZ, BECQUEREL
+from tests.helpers import evaluate
+
+
+class UnitEqualityTest(unittest.TestCase):
+    def test_parsed_unit_equals_computed_unit(self):
+        parsed = Unit.parse("m/s")
+        computed = METER / SECOND
+        self.assertEqual(parsed, computed)
+        self.assertEqual(hash(parsed), hash(computed))
+
+    def test_hashing_anonymous_unit_does_not_generate_name(self):
+        unit = METER / (KELVIN * SECOND)
+        Unit.generated_names.clear()
+        hash(unit)
+        self.assertEqual(unit, METER / (KELVIN * SECOND))
+        self.assertEqual(Unit.generated_names, {})
+
+    def test_derivatives_with_same_parts_differ(self):
+        self.assertNotEqual(HERTZ, BECQUEREL)
+
+    def test_parsed_dimensionless_unit_raised_to_float_power(self):
+        self.assertIs(NO_UNIT ** 0.5, NO_UNIT)
+        self.assertIs(Unit.parse("") ** 0.5, NO_UNIT)
+
+    def test_add_loaded_constant_to_literal(self):
+        context = Context()
+        context.variables.update(VARS["phys"])
+        self.assertEqual(evaluate(context, "c + 1 m/s").stringify(context, None), "2.99792459·10⁸ m / s")
+        self.assertEqual(evaluate(context, "1 m/s + c").stringify(context, None), "2.99792459·10⁸ m / s")
+        context.variables.update(VARS["chem"])
+        self.assertEqual(evaluate(context, "k + 1 J/K").stringify(context, None), "1.0 J / K")
+
+
+if __name__ == "__main__":
+    unittest.main()
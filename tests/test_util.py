@@ -0,0 +1,15 @@
+import unittest
+from fractions import Fraction
+
+from physcalc.util import scientific
+
+
+class ScientificTest(unittest.TestCase):
+    def test_fraction_outside_float_range(self):
+        self.assertEqual(scientific(Fraction(3, 10 ** 400)), "3.0·10⁻⁴⁰⁰")
+        self.assertEqual(scientific(Fraction(-3 * 10 ** 400, 1)), "-3.0·10⁴⁰⁰")
+        self.assertEqual(scientific(Fraction(10 ** 400, 3)), "3.3333333333333335·10³⁹⁹")
+
+
+if __name__ == "__main__":
+    unittest.main()